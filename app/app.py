@@ -1,84 +1,172 @@
-"""
-FastAPI Application Module for Python Function Execution API
-"""
-
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse, ORJSONResponse
-from starlette.types import Lifespan
-
-from app.environment import DefinitionNotFoundError, EnvironmentNotFoundError, ExecutionError, environment_router
-
-DESCRIPTION = """
-The Python Function Execution API allows users to submit, store, and execute Python functions via API calls.
-Users can define and send Python functions to the API, where the functions are stored in a database.
-Once saved, the functions can be invoked at any time by making an API request to the execution endpoint.
-
-## Key features
-
-* **Function Submission**: Send Python functions to the API, which are stored for later use.
-* **Function Invocation**: Execute stored functions by calling a dedicated API endpoint, passing necessary parameters.
-* **Function Management**: Retrieve details, update, or delete stored functions via additional API endpoints.
-* **Environment Management**: Control execution environments. Environment is a set that stores all the related functions
-for execution.
-"""
-
-
-def create_app(lifespan: Lifespan[FastAPI] | None = None) -> FastAPI:
-    """
-    Create a FastAPI application instance with the provided lifespan.
-
-    Args:
-        lifespan (Lifespan[FastAPI] | None): Lifespan instance to manage the application lifecycle.
-
-    Returns:
-        FastAPI: FastAPI application instance.
-    """
-    app = FastAPI(
-        title="PyDSL",
-        version="0.0.1",
-        summary="A python interpreter running thought HTTP using API calls",
-        description=DESCRIPTION,
-        openapi_tags=[
-            {
-                "name": "environment",
-                "description": "Operations related to the execution environment",
-            },
-            {"name": "definition", "description": "Operations related to code definitions"},
-        ],
-        servers=[{"url": "http://localhost:8000", "description": "Local development server"}],
-        license_info={
-            "name": "MIT",
-            "url": "https://opensource.org/licenses/MIT",
-        },
-        default_response_class=ORJSONResponse,
-        lifespan=lifespan,
-    )
-
-    @app.exception_handler(EnvironmentNotFoundError)
-    def environment_not_found_exception_handler(_request: Request, exc: EnvironmentNotFoundError):
-        return JSONResponse(
-            status_code=404,
-            content={"detail": f'Environment "{exc.id}" not found'},
-        )
-
-    @app.exception_handler(DefinitionNotFoundError)
-    def definition_not_found_exception_handler(_request: Request, exc: DefinitionNotFoundError):
-        return JSONResponse(
-            status_code=404,
-            content={"detail": f'Definition "{exc.id}" not found'},
-        )
-
-    @app.exception_handler(ExecutionError)
-    def execution_error_exception_handler(_request: Request, exc: ExecutionError):
-        return JSONResponse(
-            status_code=400,
-            content={
-                "detail": f'Error occurred while executing "{exc.callable}"',
-                "message": str(exc.__cause__),
-                "type": type(exc.__cause__).__name__,
-            },
-        )
-
-    app.include_router(environment_router)
-
-    return app
+"""
+FastAPI Application Module for Python Function Execution API
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, wait
+from contextlib import AsyncExitStack, asynccontextmanager
+
+import orjson
+from fastapi import FastAPI, Request, Response
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
+from fastapi.responses import ORJSONResponse
+from starlette.types import Lifespan
+
+from app.environment import AppError, environment_router
+from app.environment.executor import dispatch_batches, warm_worker
+
+DESCRIPTION = """
+The Python Function Execution API allows users to submit, store, and execute Python functions via API calls.
+Users can define and send Python functions to the API, where the functions are stored in a database.
+Once saved, the functions can be invoked at any time by making an API request to the execution endpoint.
+
+## Key features
+
+* **Function Submission**: Send Python functions to the API, which are stored for later use.
+* **Function Invocation**: Execute stored functions by calling a dedicated API endpoint, passing necessary parameters.
+* **Function Management**: Retrieve details, update, or delete stored functions via additional API endpoints.
+* **Environment Management**: Control execution environments. Environment is a set that stores all the related functions
+for execution.
+"""
+
+
+@asynccontextmanager
+async def default_lifespan(app: FastAPI):
+    """
+    Context manager that creates and disposes the process pool used for code execution.
+
+    The pool is sized to the machine and pre-warmed before the application starts
+    serving, so the first execution request does not pay worker spawn cost. The
+    forkserver start method avoids re-importing the application in every worker
+    and sidesteps fork-after-threads hazards. The OpenAPI schema is also built
+    and serialized here so no request pays the schema generation cost.
+
+    Args:
+        app (FastAPI): The application instance the lifespan is attached to.
+
+    Yields:
+        dict: State containing the ready-to-use process pool.
+    """
+    max_workers = os.cpu_count() or 1
+    mp_context = multiprocessing.get_context("forkserver")
+    mp_context.set_forkserver_preload(["app.environment.executor"])
+
+    executor = ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=mp_context,
+        initializer=warm_worker,
+    )
+
+    execution_queue: asyncio.Queue = asyncio.Queue()
+    dispatcher = asyncio.create_task(dispatch_batches(execution_queue, executor))
+
+    try:
+        wait([executor.submit(os.getpid) for _ in range(max_workers)])
+
+        yield {
+            "process_pool": executor,
+            "execution_queue": execution_queue,
+            "execution_semaphores": {},
+            "response_cache": {},
+            "openapi_bytes": orjson.dumps(app.openapi()),
+        }
+    finally:
+        dispatcher.cancel()
+        executor.shutdown()
+
+
+def merged_lifespan(*lifespans: Lifespan[FastAPI]) -> Lifespan[FastAPI]:
+    """
+    Combine multiple lifespans into a single one.
+
+    Each lifespan is entered in order and the state dictionaries they yield
+    are merged into a single state for the application.
+
+    Args:
+        *lifespans (Lifespan[FastAPI]): Lifespans to combine.
+
+    Returns:
+        Lifespan[FastAPI]: A lifespan that manages all the provided lifespans.
+    """
+    if len(lifespans) == 1:
+        return lifespans[0]
+
+    @asynccontextmanager
+    async def inner(app: FastAPI):
+        async with AsyncExitStack() as stack:
+            state: dict = {}
+            update = state.update
+
+            for lifespan in lifespans:
+                value = await stack.enter_async_context(lifespan(app))
+
+                if value:
+                    update(value)
+
+            yield state
+
+    return inner
+
+
+def create_app(lifespan: Lifespan[FastAPI] | None = None) -> FastAPI:
+    """
+    Create a FastAPI application instance with the provided lifespan.
+
+    The provided lifespan is combined with the default one, which manages
+    resources every application instance needs (such as the execution process pool).
+
+    Args:
+        lifespan (Lifespan[FastAPI] | None): Lifespan instance to manage the application lifecycle.
+
+    Returns:
+        FastAPI: FastAPI application instance.
+    """
+    lifespan = default_lifespan if lifespan is None else merged_lifespan(default_lifespan, lifespan)
+
+    app = FastAPI(
+        title="PyDSL",
+        version="0.0.1",
+        summary="A python interpreter running thought HTTP using API calls",
+        description=DESCRIPTION,
+        openapi_tags=[
+            {
+                "name": "environment",
+                "description": "Operations related to the execution environment",
+            },
+            {"name": "definition", "description": "Operations related to code definitions"},
+        ],
+        servers=[{"url": "http://localhost:8000", "description": "Local development server"}],
+        license_info={
+            "name": "MIT",
+            "url": "https://opensource.org/licenses/MIT",
+        },
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan,
+        openapi_url=None,
+        redoc_url=None,
+    )
+
+    @app.get("/openapi.json", include_in_schema=False)
+    async def openapi_schema(request: Request):
+        return Response(content=request.state.openapi_bytes, media_type="application/json")
+
+    @app.get("/docs", include_in_schema=False)
+    async def swagger_ui():
+        return get_swagger_ui_html(openapi_url="/openapi.json", title=f"{app.title} - Swagger UI")
+
+    @app.get("/redoc", include_in_schema=False)
+    async def redoc_ui():
+        return get_redoc_html(openapi_url="/openapi.json", title=f"{app.title} - ReDoc")
+
+    @app.exception_handler(AppError)
+    async def app_error_exception_handler(_request: Request, exc: AppError):
+        return ORJSONResponse(
+            status_code=exc.status_code,
+            content=exc.content,
+        )
+
+    app.include_router(environment_router)
+
+    return app
@@ -1,4 +1,4 @@
-from app.environment.exceptions import DefinitionNotFoundError, EnvironmentNotFoundError, ExecutionError
+from app.environment.exceptions import AppError, DefinitionNotFoundError, EnvironmentNotFoundError, ExecutionError
 from app.environment.router import router as environment_router
 
-__all__ = ["environment_router", "EnvironmentNotFoundError", "DefinitionNotFoundError", "ExecutionError"]
+__all__ = ["environment_router", "AppError", "EnvironmentNotFoundError", "DefinitionNotFoundError", "ExecutionError"]
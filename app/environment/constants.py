@@ -1,7 +1,15 @@
-"""
-Configuration constants for environment API response handling.
-"""
-
-ENVIRONMENTS_PER_PAGE = 25
-
-DEFINITIONS_PER_PAGE = 25
+"""
+Configuration constants for environment API response handling.
+"""
+
+ENVIRONMENTS_PER_PAGE = 25
+
+DEFINITIONS_PER_PAGE = 25
+
+MAX_PAGE_SIZE = 100
+
+RESPONSE_CACHE_SIZE = 1024
+
+SNAPSHOT_CACHE_SIZE = 1024
+
+SNAPSHOT_CACHE_TTL = 5.0
@@ -1,32 +1,85 @@
-"""
-Custom exceptions for environment errors.
-"""
-
-from uuid import UUID
-
-
-class EnvironmentNotFoundError(Exception):
-    """
-    Exception raised when an environment with specified ID cannot be found.
-    """
-
-    def __init__(self, environment_id: UUID):
-        self.id = environment_id
-
-
-class DefinitionNotFoundError(Exception):
-    """
-    Exception raised when a definition with specified ID cannot be found.
-    """
-
-    def __init__(self, definition_id: UUID):
-        self.id = definition_id
-
-
-class ExecutionError(Exception):
-    """
-    Exception raised when an error occurs during environment execution.
-    """
-
-    def __init__(self, callable_: str):
-        self.callable = callable_
+"""
+Custom exceptions for environment errors.
+"""
+
+from typing import ClassVar
+from uuid import UUID
+
+
+class AppError(Exception):
+    """
+    Base class for application errors rendered by the shared exception handler.
+    """
+
+    status_code: ClassVar[int] = 500
+
+    def __init__(self, detail: str):
+        super().__init__(detail)
+        self.detail = detail
+
+    @property
+    def content(self) -> dict:
+        """
+        Payload rendered as the error response body.
+        """
+        return {"detail": self.detail}
+
+
+class EnvironmentNotFoundError(AppError):
+    """
+    Exception raised when an environment with specified ID cannot be found.
+    """
+
+    status_code = 404
+
+    def __init__(self, environment_id: UUID):
+        super().__init__(f'Environment "{environment_id}" not found')
+        self.id = environment_id
+
+
+class DefinitionNotFoundError(AppError):
+    """
+    Exception raised when a definition with specified ID cannot be found.
+    """
+
+    status_code = 404
+
+    def __init__(self, definition_id: UUID):
+        super().__init__(f'Definition "{definition_id}" not found')
+        self.id = definition_id
+
+
+class WorkerError(Exception):
+    """
+    Parent-side stand-in for an exception raised by user code in a pool worker.
+
+    Carries the original exception's type name and message as plain strings,
+    since the exception object itself may be of a class defined inside the
+    executed source and therefore unpicklable in the parent process.
+    """
+
+    def __init__(self, error_type: str, message: str):
+        super().__init__(message)
+        self.error_type = error_type
+
+
+class ExecutionError(AppError):
+    """
+    Exception raised when an error occurs during environment execution.
+    """
+
+    status_code = 400
+
+    def __init__(self, callable_: str):
+        super().__init__(f'Error occurred while executing "{callable_}"')
+        self.callable = callable_
+
+    @property
+    def content(self) -> dict:
+        cause = self.__cause__
+
+        return {
+            "detail": self.detail,
+            "message": str(cause),
+            "type": cause.error_type if isinstance(cause, WorkerError) else type(cause).__name__,
+        }
@@ -1,37 +1,52 @@
-"""
-Database models for environment management.
-"""
-
-import datetime
-from uuid import UUID
-
-from sqlmodel import Field, Relationship, SQLModel
-from uuid_extensions import uuid7
-
-
-class Environment(SQLModel, table=True):  # type: ignore[call-arg]
-    """
-    Represents an environment configuration in the database.
-    """
-
-    id: UUID = Field(default_factory=uuid7, primary_key=True)
-    title: str | None = Field(default=None, max_length=32)
-    description: str | None = Field(default=None, max_length=128)
-    created_at: datetime.datetime = Field(default_factory=lambda: datetime.datetime.now(datetime.UTC))
-    updated_at: datetime.datetime = Field(default_factory=lambda: datetime.datetime.now(datetime.UTC))
-
-    definitions: list["CodeDefinition"] = Relationship(back_populates="environment", cascade_delete=True)
-
-
-class CodeDefinition(SQLModel, table=True):  # type: ignore[call-arg]
-    """
-    Represents a code definition associated with an environment.
-    """
-
-    id: UUID = Field(default_factory=uuid7, primary_key=True)
-    environment_id: UUID = Field(foreign_key="environment.id")
-    created_at: datetime.datetime = Field(default_factory=lambda: datetime.datetime.now(datetime.UTC))
-    updated_at: datetime.datetime = Field(default_factory=lambda: datetime.datetime.now(datetime.UTC))
-    code: str
-
-    environment: Environment = Relationship(back_populates="definitions")
+"""
+Database models for environment management.
+"""
+
+import datetime
+from uuid import UUID
+
+from sqlmodel import Field, Index, Relationship, SQLModel
+from uuid_extensions import uuid7
+
+
+def utc_now() -> datetime.datetime:
+    """
+    Naive UTC timestamp, matching what the database stores and returns.
+
+    Keeping the in-memory value identical to its database round-trip lets the
+    write paths skip the post-commit refresh without changing responses.
+    """
+    return datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+
+
+class Environment(SQLModel, table=True):  # type: ignore[call-arg]
+    """
+    Represents an environment configuration in the database.
+    """
+
+    id: UUID = Field(default_factory=uuid7, primary_key=True)
+    title: str | None = Field(default=None, max_length=32)
+    description: str | None = Field(default=None, max_length=128)
+    created_at: datetime.datetime = Field(default_factory=utc_now)
+    updated_at: datetime.datetime = Field(default_factory=utc_now)
+    source: str = Field(default="", exclude=True)
+    """Joined source of all definitions, re-assembled on every definition write."""
+
+    definitions: list["CodeDefinition"] = Relationship(back_populates="environment", passive_deletes="all")
+
+
+class CodeDefinition(SQLModel, table=True):  # type: ignore[call-arg]
+    """
+    Represents a code definition associated with an environment.
+    """
+
+    __table_args__ = (Index("ix_codedefinition_environment_id_id", "environment_id", "id"),)
+    """Composite index turning the per-environment keyset page query into a pure index range scan."""
+
+    id: UUID = Field(default_factory=uuid7, primary_key=True)
+    environment_id: UUID = Field(foreign_key="environment.id", ondelete="CASCADE")
+    created_at: datetime.datetime = Field(default_factory=utc_now)
+    updated_at: datetime.datetime = Field(default_factory=utc_now)
+    code: str
+
+    environment: Environment = Relationship(back_populates="definitions")
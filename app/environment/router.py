@@ -1,190 +1,331 @@
-"""
-FastAPI router for managing environment resources.
-"""
-
-from collections.abc import Sequence
-from typing import Annotated
-from uuid import UUID
-
-from fastapi import APIRouter, Depends, Query, Response, status
-from sqlmodel.ext.asyncio.session import AsyncSession
-
-from app.dependencies import get_session
-from app.environment import service
-from app.environment.dependencies import get_all_environment_definitions, get_definition, get_environment
-from app.environment.models import CodeDefinition, Environment
-from app.environment.schemas import (
-    DefinitionCreate,
-    DefinitionUpdate,
-    EnvironmentCreate,
-    EnvironmentUpdate,
-    ExecuteEnvironment,
-    ExecutionResult,
-)
-from app.schemas import GenericErrorData
-
-router = APIRouter(prefix="/environment")
-
-
-@router.post(path="/", response_model=Environment, status_code=201, tags=["environment"])
-async def create_environment(
-    creation_data: EnvironmentCreate, response: Response, session: Annotated[AsyncSession, Depends(get_session)]
-):
-    environment = await service.create_new_environment(session=session, creation_data=creation_data)
-
-    response.headers["Location"] = f"/environment/{environment.id}"
-
-    return environment
-
-
-@router.get(
-    path="/{environment_id}",
-    response_model=Environment,
-    status_code=status.HTTP_200_OK,
-    tags=["environment"],
-    responses={status.HTTP_404_NOT_FOUND: {"description": "Environment not found", "model": GenericErrorData}},
-)
-async def read_environment(
-    environment: Annotated[Environment, Depends(get_environment)],
-):
-    return environment
-
-
-@router.get(path="/", response_model=list[Environment], status_code=status.HTTP_200_OK, tags=["environment"])
-async def read_all_environments(
-    session: Annotated[AsyncSession, Depends(get_session)],
-    page: int = Query(default=1, ge=1, description="Page number"),
-):
-    environments = await service.find_all_environments(session=session, page=page)
-
-    return environments
-
-
-@router.patch(
-    path="/{environment_id}",
-    response_model=Environment,
-    status_code=status.HTTP_200_OK,
-    tags=["environment"],
-    responses={status.HTTP_404_NOT_FOUND: {"description": "Environment not found", "model": GenericErrorData}},
-)
-async def update_environment(
-    update_data: EnvironmentUpdate,
-    session: Annotated[AsyncSession, Depends(get_session)],
-    environment: Annotated[Environment, Depends(get_environment)],
-):
-    updated_environment = await service.update_existing_environment(
-        session=session, environment=environment, update_data=update_data
-    )
-
-    return updated_environment
-
-
-@router.delete(
-    path="/{environment_id}",
-    status_code=status.HTTP_204_NO_CONTENT,
-    tags=["environment"],
-    responses={status.HTTP_404_NOT_FOUND: {"description": "Environment not found", "model": GenericErrorData}},
-)
-async def delete_environment(
-    session: Annotated[AsyncSession, Depends(get_session)],
-    environment: Annotated[Environment, Depends(get_environment)],
-):
-    await service.delete_existing_environment(session=session, environment=environment)
-
-
-@router.post(
-    path="/{environment_id}/exec",
-    response_model=ExecutionResult,
-    status_code=status.HTTP_200_OK,
-    dependencies=[Depends(get_environment)],
-    tags=["environment"],
-)
-def execute_environment(
-    execute_data: ExecuteEnvironment,
-    definitions: Annotated[Sequence[CodeDefinition], Depends(get_all_environment_definitions)],
-):
-    result = service.execute_environment(definitions=definitions, execute_data=execute_data)
-
-    return ExecutionResult(result=result)
-
-
-@router.post(
-    path="/{environment_id}/definition",
-    response_model=CodeDefinition,
-    status_code=status.HTTP_201_CREATED,
-    dependencies=[Depends(get_environment)],
-    tags=["definition"],
-)
-async def create_definition(
-    environment_id: UUID,
-    create_data: DefinitionCreate,
-    session: Annotated[AsyncSession, Depends(get_session)],
-):
-    definition = await service.create_new_code_definition(
-        session=session, environment_id=environment_id, create_data=create_data
-    )
-
-    return definition
-
-
-@router.get(
-    path="/{environment_id}/definition",
-    response_model=list[CodeDefinition],
-    status_code=status.HTTP_200_OK,
-    dependencies=[Depends(get_environment)],
-    tags=["definition"],
-    responses={status.HTTP_404_NOT_FOUND: {"description": "Environment not found", "model": GenericErrorData}},
-)
-async def read_all_definitions(
-    environment_id: UUID,
-    session: Annotated[AsyncSession, Depends(get_session)],
-    page: int = Query(default=1, ge=1, description="Page number"),
-):
-    definitions = await service.find_all_code_definitions(session=session, environment_id=environment_id, page=page)
-
-    return definitions
-
-
-@router.get(
-    path="/{environment_id}/definition/{definition_id}",
-    response_model=CodeDefinition,
-    status_code=status.HTTP_200_OK,
-    tags=["definition"],
-    responses={status.HTTP_404_NOT_FOUND: {"description": "Definition not found", "model": GenericErrorData}},
-)
-async def read_definition(
-    definition: Annotated[CodeDefinition, Depends(get_definition)],
-):
-    return definition
-
-
-@router.patch(
-    path="/{environment_id}/definition/{definition_id}",
-    response_model=CodeDefinition,
-    status_code=status.HTTP_200_OK,
-    tags=["definition"],
-    responses={status.HTTP_404_NOT_FOUND: {"description": "Definition not found", "model": GenericErrorData}},
-)
-async def update_definition(
-    update_data: DefinitionUpdate,
-    session: Annotated[AsyncSession, Depends(get_session)],
-    definition: Annotated[CodeDefinition, Depends(get_definition)],
-):
-    updated_definition = await service.update_existing_code_definition(
-        session=session, definition=definition, update_data=update_data
-    )
-
-    return updated_definition
-
-
-@router.delete(
-    path="/{environment_id}/definition/{definition_id}",
-    status_code=status.HTTP_204_NO_CONTENT,
-    tags=["definition"],
-    responses={status.HTTP_404_NOT_FOUND: {"description": "Definition not found", "model": GenericErrorData}},
-)
-async def delete_definition(
-    session: Annotated[AsyncSession, Depends(get_session)],
-    definition: Annotated[CodeDefinition, Depends(get_definition)],
-):
-    await service.delete_existing_code_definition(session=session, definition=definition)
+"""
+FastAPI router for managing environment resources.
+"""
+
+from collections.abc import Sequence
+from concurrent.futures import BrokenExecutor
+from typing import Annotated
+from uuid import UUID
+
+import orjson
+from fastapi import APIRouter, Body, Depends, Query, Request, Response, status
+from fastapi.responses import ORJSONResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.dependencies import get_session
+from app.environment import executor, service
+from app.environment.constants import DEFINITIONS_PER_PAGE, ENVIRONMENTS_PER_PAGE, MAX_PAGE_SIZE, RESPONSE_CACHE_SIZE
+from app.environment.dependencies import get_definition, get_environment, get_environment_snapshot
+from app.environment.exceptions import DefinitionNotFoundError, EnvironmentNotFoundError, ExecutionError
+from app.environment.models import CodeDefinition, Environment
+from app.environment.schemas import (
+    DefinitionCreate,
+    DefinitionUpdate,
+    EnvironmentCreate,
+    EnvironmentUpdate,
+    ExecuteEnvironment,
+    ExecutionResult,
+)
+from app.schemas import CursorPage, GenericErrorData
+
+router = APIRouter(prefix="/environment", default_response_class=ORJSONResponse)
+
+
+def _serialize_cached(cache: dict, model: Environment | CodeDefinition) -> bytes:
+    """
+    Serialize a model to JSON bytes, cached per row version.
+
+    Entries are keyed by (type, ID, updated_at), so an update naturally rolls
+    the key while stale versions age out of the bounded cache. Repeat reads of
+    an unchanged row skip Pydantic serialization entirely.
+
+    Args:
+        cache (dict): The response cache from the application state.
+        model (Environment | CodeDefinition): The row to serialize.
+
+    Returns:
+        bytes: The serialized JSON payload.
+    """
+    key = (type(model).__name__, model.id, model.updated_at)
+    payload = cache.get(key)
+
+    if payload is None:
+        payload = orjson.dumps(model.model_dump(mode="json"))
+
+        if len(cache) >= RESPONSE_CACHE_SIZE:
+            cache.pop(next(iter(cache)))
+
+        cache[key] = payload
+
+    return payload
+
+
+def _page_etag(rows: Sequence[Environment | CodeDefinition]) -> str:
+    """
+    Build a weak ETag for a page of rows from data already fetched.
+
+    Derived from the row count and the newest update timestamp, so no extra
+    query is needed and any write to a listed row rolls the value.
+
+    Args:
+        rows (Sequence[Environment | CodeDefinition]): The fetched page.
+
+    Returns:
+        str: The weak ETag value.
+    """
+    newest = max((row.updated_at.timestamp() for row in rows), default=0.0)
+
+    return f'W/"{len(rows)}-{int(newest * 1000)}"'
+
+
+def _version_etag(model: Environment | CodeDefinition) -> str:
+    """
+    Build a weak ETag for a row from its update timestamp.
+
+    Args:
+        model (Environment | CodeDefinition): The row to build the ETag for.
+
+    Returns:
+        str: The weak ETag value.
+    """
+    return f'W/"{int(model.updated_at.timestamp() * 1000)}"'
+
+
+@router.post(path="/", response_model=Environment, status_code=201, tags=["environment"])
+async def create_environment(
+    creation_data: EnvironmentCreate, response: Response, session: Annotated[AsyncSession, Depends(get_session)]
+):
+    environment = await service.create_new_environment(session=session, creation_data=creation_data)
+
+    response.headers["Location"] = f"/environment/{environment.id}"
+
+    return environment
+
+
+@router.get(
+    path="/{environment_id}",
+    response_model=Environment,
+    status_code=status.HTTP_200_OK,
+    tags=["environment"],
+    responses={status.HTTP_404_NOT_FOUND: {"description": "Environment not found", "model": GenericErrorData}},
+)
+async def read_environment(
+    request: Request,
+    environment: Annotated[Environment, Depends(get_environment)],
+):
+    etag = _version_etag(environment)
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    payload = _serialize_cached(request.state.response_cache, environment)
+
+    return Response(content=payload, media_type="application/json", headers={"ETag": etag})
+
+
+@router.get(path="/", response_model=CursorPage[Environment], status_code=status.HTTP_200_OK, tags=["environment"])
+async def read_all_environments(
+    request: Request,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    after: Annotated[UUID | None, Query(description="Cursor: return environments with an ID after this one")] = None,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE, description="Page size")] = ENVIRONMENTS_PER_PAGE,
+):
+    environments = await service.find_all_environments(session=session, after=after, limit=limit)
+    etag = _page_etag(environments)
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    return ORJSONResponse(
+        {
+            "items": [environment.model_dump(mode="json") for environment in environments],
+            "next_cursor": str(environments[-1].id) if len(environments) == limit else None,
+        },
+        headers={"ETag": etag},
+    )
+
+
+@router.patch(
+    path="/{environment_id}",
+    response_model=Environment,
+    status_code=status.HTTP_200_OK,
+    tags=["environment"],
+    responses={status.HTTP_404_NOT_FOUND: {"description": "Environment not found", "model": GenericErrorData}},
+)
+async def update_environment(
+    update_data: EnvironmentUpdate,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    environment: Annotated[Environment, Depends(get_environment)],
+):
+    updated_environment = await service.update_existing_environment(
+        session=session, environment=environment, update_data=update_data
+    )
+
+    return updated_environment
+
+
+@router.delete(
+    path="/{environment_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    tags=["environment"],
+    responses={status.HTTP_404_NOT_FOUND: {"description": "Environment not found", "model": GenericErrorData}},
+)
+async def delete_environment(
+    environment_id: UUID,
+    session: Annotated[AsyncSession, Depends(get_session)],
+):
+    deleted = await service.delete_environment_by_id(session=session, environment_id=environment_id)
+
+    if not deleted:
+        raise EnvironmentNotFoundError(environment_id=environment_id)
+
+
+@router.post(
+    path="/{environment_id}/exec",
+    response_model=ExecutionResult,
+    status_code=status.HTTP_200_OK,
+    tags=["environment"],
+)
+async def execute_environment(
+    request: Request,
+    execute_data: ExecuteEnvironment,
+    snapshot: Annotated[executor.EnvironmentSnapshot, Depends(get_environment_snapshot)],
+):
+    async with executor.environment_semaphore(request.state.execution_semaphores, snapshot[0]):
+        try:
+            result = await executor.submit_execution(request.state.execution_queue, snapshot, execute_data)
+        except BrokenExecutor:
+            # An infrastructure failure, not the user's callable: let it
+            # surface as a 500 instead of blaming the request.
+            raise
+        except Exception as e:
+            raise ExecutionError(callable_=execute_data.callable) from e
+
+    return Response(content=b'{"result":' + result + b"}", media_type="application/json")
+
+
+@router.post(
+    path="/{environment_id}/definition",
+    response_model=CodeDefinition,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(get_environment)],
+    tags=["definition"],
+)
+async def create_definition(
+    environment_id: UUID,
+    create_data: DefinitionCreate,
+    session: Annotated[AsyncSession, Depends(get_session)],
+):
+    definition = await service.create_new_code_definition(
+        session=session, environment_id=environment_id, create_data=create_data
+    )
+
+    return definition
+
+
+@router.post(
+    path="/{environment_id}/definition/bulk",
+    response_model=list[CodeDefinition],
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(get_environment)],
+    tags=["definition"],
+    responses={status.HTTP_404_NOT_FOUND: {"description": "Environment not found", "model": GenericErrorData}},
+)
+async def create_definitions_bulk(
+    environment_id: UUID,
+    create_data: Annotated[list[DefinitionCreate], Body(min_length=1)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+):
+    definitions = await service.create_many_code_definitions(
+        session=session, environment_id=environment_id, create_data=create_data
+    )
+
+    return definitions
+
+
+@router.get(
+    path="/{environment_id}/definition",
+    response_model=CursorPage[CodeDefinition],
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(get_environment)],
+    tags=["definition"],
+    responses={status.HTTP_404_NOT_FOUND: {"description": "Environment not found", "model": GenericErrorData}},
+)
+async def read_all_definitions(
+    request: Request,
+    environment_id: UUID,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    after: Annotated[UUID | None, Query(description="Cursor: return definitions with an ID after this one")] = None,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE, description="Page size")] = DEFINITIONS_PER_PAGE,
+):
+    definitions = await service.find_all_code_definitions(
+        session=session, environment_id=environment_id, after=after, limit=limit
+    )
+    etag = _page_etag(definitions)
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    return ORJSONResponse(
+        {
+            "items": [definition.model_dump(mode="json") for definition in definitions],
+            "next_cursor": str(definitions[-1].id) if len(definitions) == limit else None,
+        },
+        headers={"ETag": etag},
+    )
+
+
+@router.get(
+    path="/{environment_id}/definition/{definition_id}",
+    response_model=CodeDefinition,
+    status_code=status.HTTP_200_OK,
+    tags=["definition"],
+    responses={status.HTTP_404_NOT_FOUND: {"description": "Definition not found", "model": GenericErrorData}},
+)
+async def read_definition(
+    request: Request,
+    definition: Annotated[CodeDefinition, Depends(get_definition)],
+):
+    etag = _version_etag(definition)
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    payload = _serialize_cached(request.state.response_cache, definition)
+
+    return Response(content=payload, media_type="application/json", headers={"ETag": etag})
+
+
+@router.patch(
+    path="/{environment_id}/definition/{definition_id}",
+    response_model=CodeDefinition,
+    status_code=status.HTTP_200_OK,
+    tags=["definition"],
+    responses={status.HTTP_404_NOT_FOUND: {"description": "Definition not found", "model": GenericErrorData}},
+)
+async def update_definition(
+    update_data: DefinitionUpdate,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    definition: Annotated[CodeDefinition, Depends(get_definition)],
+):
+    updated_definition = await service.update_existing_code_definition(
+        session=session, definition=definition, update_data=update_data
+    )
+
+    return updated_definition
+
+
+@router.delete(
+    path="/{environment_id}/definition/{definition_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    tags=["definition"],
+    responses={status.HTTP_404_NOT_FOUND: {"description": "Definition not found", "model": GenericErrorData}},
+)
+async def delete_definition(
+    definition_id: UUID,
+    session: Annotated[AsyncSession, Depends(get_session)],
+):
+    deleted = await service.delete_code_definition_by_id(session=session, definition_id=definition_id)
+
+    if not deleted:
+        raise DefinitionNotFoundError(definition_id=definition_id)
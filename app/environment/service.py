@@ -1,315 +1,446 @@
-"""
-Service layer for managing environment operations.
-"""
-
-import datetime
-from collections.abc import Mapping, Sequence
-from typing import Any
-from uuid import UUID
-
-from sqlmodel import select
-from sqlmodel.ext.asyncio.session import AsyncSession
-
-from app.environment.constants import DEFINITIONS_PER_PAGE, ENVIRONMENTS_PER_PAGE
-from app.environment.exceptions import ExecutionError
-from app.environment.models import CodeDefinition, Environment
-from app.environment.schemas import (
-    DefinitionCreate,
-    DefinitionUpdate,
-    EnvironmentCreate,
-    EnvironmentUpdate,
-    ExecuteEnvironment,
-)
-
-
-async def create_new_environment(session: AsyncSession, creation_data: EnvironmentCreate) -> Environment:
-    """
-    Create a new environment in the database.
-
-    This function creates a new environment using the provided creation data
-    and adds it to the database. The environment is then committed and refreshed
-    to ensure it is up-to-date with the database state.
-
-    Args:
-        session (AsyncSession): The asynchronous sqlmodel session used to
-                                interact with the database.
-        creation_data (EnvironmentCreate): The data required to create a new
-                                           environment, including title and
-                                           description.
-
-    Returns:
-        Environment: The newly created Environment object.
-    """
-    environment = Environment.model_validate(creation_data)
-
-    session.add(environment)
-    await session.commit()
-    await session.refresh(environment)
-
-    return environment
-
-
-async def find_all_environments(session: AsyncSession, page: int) -> Sequence[Environment]:
-    """
-    Retrieve a paginated list of all environments from the database.
-
-    This function constructs a SQL query to select environments, applying
-    pagination based on the provided page number.
-
-    Args:
-        session (AsyncSession): The asynchronous sqlmodel session used to
-                                interact with the database.
-        page (int): The page number for pagination. Determines the offset
-                    for the query.
-
-    Returns:
-        Sequence[Environment]: A sequence of Environment objects representing
-                               the environments retrieved from the database.
-    """
-    statement = (
-        select(Environment)
-        .offset((page - 1) * ENVIRONMENTS_PER_PAGE)
-        .limit(ENVIRONMENTS_PER_PAGE)
-        .order_by(Environment.id)
-    )
-
-    result = await session.exec(statement)
-    return result.all()
-
-
-async def try_find_environment(session: AsyncSession, environment_id: UUID) -> Environment | None:
-    """
-    Retrieve an environment by its ID from the database.
-
-    This function attempts to find an environment in the database using
-    the provided environment ID. If the environment is found, it is returned;
-    otherwise, None is returned.
-
-    Args:
-        session (AsyncSession): The asynchronous sqlmodel session used to
-                                interact with the database.
-        environment_id (UUID): The unique identifier of the environment to
-                               be retrieved.
-
-    Returns:
-        Environment | None: The Environment object if found, otherwise None.
-    """
-    result = await session.get(Environment, environment_id)
-    return result
-
-
-async def update_existing_environment(
-    session: AsyncSession, environment: Environment, update_data: EnvironmentUpdate
-) -> Environment:
-    """
-    Update an existing environment with new data.
-
-    Args:
-        session (AsyncSession): The asynchronous sqlmodel session used to
-                                interact with the database.
-        environment (Environment): The environment instance to update.
-        update_data (EnvironmentUpdate): The data to update the environment with.
-
-    Returns:
-        Environment: The updated environment instance.
-    """
-    environment_data = update_data.model_dump(exclude_unset=True)
-    environment_data["updated_at"] = datetime.datetime.now(datetime.UTC)
-
-    environment.sqlmodel_update(environment_data)
-    await session.commit()
-    await session.refresh(environment)
-
-    return environment
-
-
-async def delete_existing_environment(session: AsyncSession, environment: Environment):
-    """
-    Delete an existing environment from the database.
-
-    Args:
-        session (AsyncSession): The asynchronous sqlmodel session used to
-                                interact with the database.
-        environment (Environment): The environment instance to delete.
-
-    Returns:
-        None
-    """
-    await session.delete(environment)
-    await session.commit()
-
-
-async def create_new_code_definition(
-    session: AsyncSession, environment_id: UUID, create_data: DefinitionCreate
-) -> CodeDefinition:
-    """Create and persist a new code definition in the database.
-
-    Args:
-        session (AsyncSession): The database session for performing database operations
-        environment_id (UUID): The unique identifier of the environment
-        create_data (DefinitionCreate): The data object containing the code to be stored
-
-    Returns:
-        CodeDefinition: The newly created code definition object with populated database fields
-    """
-    definition = CodeDefinition(environment_id=environment_id, code=create_data.code.strip())
-
-    session.add(definition)
-    await session.commit()
-    await session.refresh(definition)
-
-    return definition
-
-
-async def find_all_code_definitions(session: AsyncSession, environment_id: UUID, page: int) -> Sequence[CodeDefinition]:
-    """
-    Retrieve a paginated list of code definitions for a specific environment from the database.
-
-    This function constructs a SQL query to select code definitions associated with a given
-    environment ID, applying pagination based on the provided page number.
-
-    Args:
-        session (AsyncSession): The asynchronous sqlmodel session used to
-                                interact with the database.
-        environment_id (UUID): The unique identifier of the environment whose
-                               code definitions are to be retrieved.
-        page (int): The page number for pagination. Determines the offset
-                    for the query.
-
-    Returns:
-        Sequence[CodeDefinition]: A sequence of CodeDefinition objects representing
-                                  the code definitions retrieved from the database.
-    """
-    statement = (
-        select(CodeDefinition)
-        .where(CodeDefinition.environment_id == environment_id)
-        .offset((page - 1) * DEFINITIONS_PER_PAGE)
-        .limit(DEFINITIONS_PER_PAGE)
-        .order_by(CodeDefinition.id)
-    )
-
-    result = await session.exec(statement)
-    return result.all()
-
-
-async def find_all_code_definitions_unpaged(session: AsyncSession, environment_id: UUID) -> Sequence[CodeDefinition]:
-    """
-    Retrieve all code definitions for a specific environment from the database.
-
-    This function constructs a SQL query to select code definitions associated with a given
-    environment ID.
-
-    Args:
-        session (AsyncSession): The asynchronous sqlmodel session used to
-                                interact with the database.
-        environment_id (UUID): The unique identifier of the environment whose
-                               code definitions are to be retrieved.
-
-    Returns:
-        Sequence[CodeDefinition]: A sequence of CodeDefinition objects representing
-                                  the code definitions retrieved from the database.
-    """
-    statement = select(CodeDefinition).where(CodeDefinition.environment_id == environment_id)
-
-    result = await session.exec(statement)
-    return result.all()
-
-
-async def try_find_code_definition(session: AsyncSession, definition_id: UUID) -> CodeDefinition | None:
-    """
-    Retrieve a code definition by its ID from the database.
-
-    This function attempts to find a code definition in the database using
-    the provided definition ID. If the code definition is found, it is returned;
-    otherwise, None is returned.
-
-    Args:
-        session (AsyncSession): The asynchronous sqlmodel session used to
-                                interact with the database.
-        definition_id (UUID): The unique identifier of the code definition to
-                              be retrieved.
-
-    Returns:
-        CodeDefinition | None: The CodeDefinition object if found, otherwise None.
-    """
-    result = await session.get(CodeDefinition, definition_id)
-    return result
-
-
-async def update_existing_code_definition(
-    session: AsyncSession, definition: CodeDefinition, update_data: DefinitionUpdate
-) -> CodeDefinition:
-    """
-    Update an existing code definition with new data.
-
-    Args:
-        session (AsyncSession): The asynchronous sqlmodel session used to interact with the database.
-        definition (CodeDefinition): The code definition instance to update.
-        update_data (DefinitionUpdate): The data to update the code definition with.
-
-    Returns:
-        CodeDefinition: The updated code definition instance.
-    """
-    definition_data = update_data.model_dump(exclude_unset=True)
-    definition_data["updated_at"] = datetime.datetime.now(datetime.UTC)
-
-    definition.sqlmodel_update(definition_data)
-    await session.commit()
-    await session.refresh(definition)
-
-    return definition
-
-
-async def delete_existing_code_definition(session: AsyncSession, definition: CodeDefinition):
-    """
-    Delete an existing code definition from the database.
-
-    Args:
-        session (AsyncSession): The asynchronous sqlmodel session used to interact with the database.
-        definition (CodeDefinition): The code definition instance to delete.
-
-    Returns:
-        None
-    """
-    await session.delete(definition)
-    await session.commit()
-
-
-def execute_environment(definitions: Sequence[CodeDefinition], execute_data: ExecuteEnvironment) -> Any:
-    """
-    Execute the provided code definitions with the provided execution data.
-
-    Args:
-        definitions (Sequence[CodeDefinition]): The code definitions to execute.
-        execute_data (ExecuteEnvironment): The data required to execute the code.
-
-    Returns:
-        Any: The result of executing the code.
-    """
-    code = "\n\n".join(definition.code for definition in definitions)
-    code += f"""
-        __INTERNAL__RETURN__ = {execute_data.callable}(*{execute_data.args}, **{execute_data.kwargs})
-    """.strip()
-
-    try:
-        result = _run_code(code)
-    except Exception as e:
-        raise ExecutionError(callable_=execute_data.callable) from e
-
-    return result
-
-
-def _run_code(code: str) -> Any:
-    """
-    Execute the provided code and return the result.
-
-    Args:
-        code (str): The code to execute.
-
-    Returns:
-        Any: The result of the executed code.
-    """
-    loc: Mapping[str, object] = {}
-    exec(code, {}, loc)  # noqa: S102, pylint: disable=W0122
-
-    return loc["__INTERNAL__RETURN__"]
+"""
+Service layer for managing environment operations.
+"""
+
+import asyncio
+import time
+from collections.abc import Sequence
+from typing import cast
+from uuid import UUID
+
+from sqlalchemy import CursorResult
+from sqlmodel import col, delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.environment.constants import SNAPSHOT_CACHE_SIZE, SNAPSHOT_CACHE_TTL
+from app.environment.executor import EnvironmentSnapshot
+from app.environment.models import CodeDefinition, Environment, utc_now
+from app.environment.schemas import (
+    DefinitionCreate,
+    DefinitionUpdate,
+    EnvironmentCreate,
+    EnvironmentUpdate,
+)
+
+
+async def create_new_environment(session: AsyncSession, creation_data: EnvironmentCreate) -> Environment:
+    """
+    Create a new environment in the database.
+
+    This function creates a new environment using the provided creation data
+    and adds it to the database. Every column value is generated client-side,
+    so the committed instance is already up-to-date and no re-fetch is needed.
+
+    Args:
+        session (AsyncSession): The asynchronous sqlmodel session used to
+                                interact with the database.
+        creation_data (EnvironmentCreate): The data required to create a new
+                                           environment, including title and
+                                           description.
+
+    Returns:
+        Environment: The newly created Environment object.
+    """
+    environment = Environment.model_validate(creation_data)
+
+    session.add(environment)
+    await session.commit()
+
+    return environment
+
+
+async def find_all_environments(session: AsyncSession, after: UUID | None, limit: int) -> Sequence[Environment]:
+    """
+    Retrieve a page of environments from the database using keyset pagination.
+
+    Instead of an OFFSET scan whose cost grows with page depth, the query
+    seeks directly to the cursor position on the primary key index, so every
+    page costs the same regardless of how deep it is.
+
+    Args:
+        session (AsyncSession): The asynchronous sqlmodel session used to
+                                interact with the database.
+        after (UUID | None): Cursor pointing at the last environment of the
+                             previous page, or None for the first page.
+        limit (int): Maximum number of environments to return.
+
+    Returns:
+        Sequence[Environment]: A sequence of Environment objects representing
+                               the environments retrieved from the database.
+    """
+    statement = select(Environment).order_by(col(Environment.id)).limit(limit)
+
+    if after is not None:
+        statement = statement.where(col(Environment.id) > after)
+
+    result = await session.exec(statement)
+    return result.all()
+
+
+async def try_find_environment(session: AsyncSession, environment_id: UUID) -> Environment | None:
+    """
+    Retrieve an environment by its ID from the database.
+
+    This function attempts to find an environment in the database using
+    the provided environment ID. If the environment is found, it is returned;
+    otherwise, None is returned.
+
+    Args:
+        session (AsyncSession): The asynchronous sqlmodel session used to
+                                interact with the database.
+        environment_id (UUID): The unique identifier of the environment to
+                               be retrieved.
+
+    Returns:
+        Environment | None: The Environment object if found, otherwise None.
+    """
+    result = await session.get(Environment, environment_id)
+    return result
+
+
+_environment_snapshots: dict[UUID, tuple[float, EnvironmentSnapshot]] = {}
+
+_snapshot_fetches: dict[UUID, asyncio.Future] = {}
+
+_snapshot_generations: dict[UUID, int] = {}
+
+
+def _invalidate_environment_snapshot(environment_id: UUID) -> None:
+    """
+    Drop the cached execution snapshot of an environment, if any.
+
+    The environment's generation is bumped as well, so an in-flight fetch
+    that read the row before this invalidation cannot re-populate the cache
+    with its now-stale snapshot.
+
+    Args:
+        environment_id (UUID): The unique identifier of the environment whose
+                               snapshot is to be dropped.
+    """
+    _environment_snapshots.pop(environment_id, None)
+
+    if len(_snapshot_generations) >= SNAPSHOT_CACHE_SIZE:
+        _snapshot_generations.pop(next(iter(_snapshot_generations)))
+
+    _snapshot_generations[environment_id] = _snapshot_generations.get(environment_id, 0) + 1
+
+
+async def find_environment_snapshot(session: AsyncSession, environment_id: UUID) -> EnvironmentSnapshot | None:
+    """
+    Retrieve the execution snapshot of an environment, cached with a short TTL.
+
+    Hot environments are executed far more often than they change, so the
+    execute path serves repeat calls from an in-process cache instead of
+    hitting the database on every request. Mutation paths invalidate the
+    entry immediately; the TTL only bounds staleness across server processes.
+    Concurrent misses for the same environment coalesce onto a single
+    in-flight fetch, so a cold-start burst pays the query exactly once.
+
+    Args:
+        session (AsyncSession): The asynchronous sqlmodel session used to
+                                interact with the database.
+        environment_id (UUID): The unique identifier of the environment to
+                               be retrieved.
+
+    Returns:
+        EnvironmentSnapshot | None: The snapshot if the environment exists, otherwise None.
+    """
+    cached = _environment_snapshots.get(environment_id)
+
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+
+    inflight = _snapshot_fetches.get(environment_id)
+
+    if inflight is not None:
+        return await inflight
+
+    future: asyncio.Future = asyncio.get_running_loop().create_future()
+    _snapshot_fetches[environment_id] = future
+    generation = _snapshot_generations.get(environment_id, 0)
+
+    try:
+        environment = await session.get(Environment, environment_id)
+
+        if environment is None:
+            snapshot = None
+        else:
+            snapshot = (str(environment.id), environment.updated_at.timestamp(), environment.source)
+
+            # Only cache if no invalidation ran while the row was being read;
+            # a fetch that raced a write may hold the pre-write snapshot.
+            if generation == _snapshot_generations.get(environment_id, 0):
+                if len(_environment_snapshots) >= SNAPSHOT_CACHE_SIZE:
+                    _environment_snapshots.pop(next(iter(_environment_snapshots)))
+
+                _environment_snapshots[environment_id] = (time.monotonic() + SNAPSHOT_CACHE_TTL, snapshot)
+
+        future.set_result(snapshot)
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # mark as retrieved in case no other request is waiting
+        raise
+    finally:
+        # A cancelled leader (e.g. client disconnect mid-fetch) reaches here
+        # with the future still pending; cancel it so coalesced waiters fail
+        # over instead of awaiting forever.
+        if not future.done():
+            future.cancel()
+
+        del _snapshot_fetches[environment_id]
+
+    return snapshot
+
+
+async def update_existing_environment(
+    session: AsyncSession, environment: Environment, update_data: EnvironmentUpdate
+) -> Environment:
+    """
+    Update an existing environment with new data.
+
+    Args:
+        session (AsyncSession): The asynchronous sqlmodel session used to
+                                interact with the database.
+        environment (Environment): The environment instance to update.
+        update_data (EnvironmentUpdate): The data to update the environment with.
+
+    Returns:
+        Environment: The updated environment instance.
+    """
+    for name in update_data.model_fields_set:
+        setattr(environment, name, getattr(update_data, name))
+
+    environment.updated_at = utc_now()
+
+    await session.commit()
+    _invalidate_environment_snapshot(environment.id)
+
+    return environment
+
+
+async def delete_environment_by_id(session: AsyncSession, environment_id: UUID) -> bool:
+    """
+    Delete an environment by its ID in a single statement.
+
+    The row is never loaded: the DELETE goes straight to the database and the
+    ON DELETE CASCADE on the definition foreign key removes the children in
+    the same statement, instead of a SELECT plus per-row ORM cascade.
+
+    Args:
+        session (AsyncSession): The asynchronous sqlmodel session used to
+                                interact with the database.
+        environment_id (UUID): The unique identifier of the environment to delete.
+
+    Returns:
+        bool: True if an environment was deleted, False if none existed.
+    """
+    result = await session.execute(delete(Environment).where(col(Environment.id) == environment_id))
+    await session.commit()
+    _invalidate_environment_snapshot(environment_id)
+
+    # rowcount lives on CursorResult, not the Result the session is typed to return.
+    return cast("CursorResult", result).rowcount > 0
+
+
+async def _refresh_environment_source(session: AsyncSession, environment_id: UUID) -> None:
+    """
+    Re-assemble and store the joined source of an environment's definitions.
+
+    Called from every definition write path inside the same transaction, so
+    the execute path can read the pre-joined source with a single row lookup
+    instead of scanning and concatenating definitions on every call. The
+    environment's updated_at is bumped so its code version rolls as well.
+    Rows are streamed rather than materialized, so peak memory stays at the
+    joined string plus one row instead of double-buffering the whole set.
+    Callers invalidate the snapshot cache themselves, after their commit:
+    invalidating pre-commit would let a fetch in the commit window cache the
+    old row under the new generation.
+
+    Args:
+        session (AsyncSession): The asynchronous sqlmodel session used to
+                                interact with the database.
+        environment_id (UUID): The unique identifier of the environment whose
+                               source is to be re-assembled.
+    """
+    statement = (
+        select(CodeDefinition.code)
+        .where(col(CodeDefinition.environment_id) == environment_id)
+        .order_by(col(CodeDefinition.id))
+    )
+
+    parts = [code async for code in await session.stream_scalars(statement)]
+
+    environment = await session.get_one(Environment, environment_id)
+    environment.source = "\n\n".join(parts)
+    environment.updated_at = utc_now()
+
+
+async def create_new_code_definition(
+    session: AsyncSession, environment_id: UUID, create_data: DefinitionCreate
+) -> CodeDefinition:
+    """Create and persist a new code definition in the database.
+
+    Args:
+        session (AsyncSession): The database session for performing database operations
+        environment_id (UUID): The unique identifier of the environment
+        create_data (DefinitionCreate): The data object containing the code to be stored
+
+    Returns:
+        CodeDefinition: The newly created code definition object with populated database fields
+    """
+    definition = CodeDefinition(environment_id=environment_id, code=create_data.code.strip())
+
+    session.add(definition)
+    await session.flush()
+    await _refresh_environment_source(session=session, environment_id=environment_id)
+    await session.commit()
+    _invalidate_environment_snapshot(environment_id)
+
+    return definition
+
+
+async def create_many_code_definitions(
+    session: AsyncSession, environment_id: UUID, create_data: Sequence[DefinitionCreate]
+) -> Sequence[CodeDefinition]:
+    """Create and persist several code definitions in a single transaction.
+
+    N separate creation calls would each pay their own commit and source
+    rebuild; batching them keeps it to one of each regardless of N.
+
+    Args:
+        session (AsyncSession): The database session for performing database operations
+        environment_id (UUID): The unique identifier of the environment
+        create_data (Sequence[DefinitionCreate]): The data objects containing the code to be stored
+
+    Returns:
+        Sequence[CodeDefinition]: The newly created code definition objects in input order
+    """
+    definitions = [CodeDefinition(environment_id=environment_id, code=data.code.strip()) for data in create_data]
+
+    session.add_all(definitions)
+    await session.flush()
+    await _refresh_environment_source(session=session, environment_id=environment_id)
+    await session.commit()
+    _invalidate_environment_snapshot(environment_id)
+
+    return definitions
+
+
+async def find_all_code_definitions(
+    session: AsyncSession, environment_id: UUID, after: UUID | None, limit: int
+) -> Sequence[CodeDefinition]:
+    """
+    Retrieve a page of code definitions for a specific environment from the
+    database using keyset pagination.
+
+    Instead of an OFFSET scan whose cost grows with page depth, the query
+    seeks directly to the cursor position on the primary key index, so every
+    page costs the same regardless of how deep it is.
+
+    Args:
+        session (AsyncSession): The asynchronous sqlmodel session used to
+                                interact with the database.
+        environment_id (UUID): The unique identifier of the environment whose
+                               code definitions are to be retrieved.
+        after (UUID | None): Cursor pointing at the last definition of the
+                             previous page, or None for the first page.
+        limit (int): Maximum number of definitions to return.
+
+    Returns:
+        Sequence[CodeDefinition]: A sequence of CodeDefinition objects representing
+                                  the code definitions retrieved from the database.
+    """
+    statement = (
+        select(CodeDefinition)
+        .where(col(CodeDefinition.environment_id) == environment_id)
+        .order_by(col(CodeDefinition.id))
+        .limit(limit)
+    )
+
+    if after is not None:
+        statement = statement.where(col(CodeDefinition.id) > after)
+
+    result = await session.exec(statement)
+    return result.all()
+
+
+async def try_find_code_definition(session: AsyncSession, definition_id: UUID) -> CodeDefinition | None:
+    """
+    Retrieve a code definition by its ID from the database.
+
+    This function attempts to find a code definition in the database using
+    the provided definition ID. If the code definition is found, it is returned;
+    otherwise, None is returned.
+
+    Args:
+        session (AsyncSession): The asynchronous sqlmodel session used to
+                                interact with the database.
+        definition_id (UUID): The unique identifier of the code definition to
+                              be retrieved.
+
+    Returns:
+        CodeDefinition | None: The CodeDefinition object if found, otherwise None.
+    """
+    result = await session.get(CodeDefinition, definition_id)
+    return result
+
+
+async def update_existing_code_definition(
+    session: AsyncSession, definition: CodeDefinition, update_data: DefinitionUpdate
+) -> CodeDefinition:
+    """
+    Update an existing code definition with new data.
+
+    Args:
+        session (AsyncSession): The asynchronous sqlmodel session used to interact with the database.
+        definition (CodeDefinition): The code definition instance to update.
+        update_data (DefinitionUpdate): The data to update the code definition with.
+
+    Returns:
+        CodeDefinition: The updated code definition instance.
+    """
+    for name in update_data.model_fields_set:
+        setattr(definition, name, getattr(update_data, name))
+
+    definition.updated_at = utc_now()
+
+    await session.flush()
+    await _refresh_environment_source(session=session, environment_id=definition.environment_id)
+    await session.commit()
+    _invalidate_environment_snapshot(definition.environment_id)
+
+    return definition
+
+
+async def delete_code_definition_by_id(session: AsyncSession, definition_id: UUID) -> bool:
+    """
+    Delete a code definition by its ID in a single statement.
+
+    The row is never loaded; RETURNING hands back the owning environment ID
+    so the source rebuild can run in the same transaction.
+
+    Args:
+        session (AsyncSession): The asynchronous sqlmodel session used to interact with the database.
+        definition_id (UUID): The unique identifier of the code definition to delete.
+
+    Returns:
+        bool: True if a definition was deleted, False if none existed.
+    """
+    statement = (
+        delete(CodeDefinition)
+        .where(col(CodeDefinition.id) == definition_id)
+        .returning(col(CodeDefinition.environment_id))
+    )
+
+    result = await session.execute(statement)
+    environment_id = result.scalar_one_or_none()
+
+    if environment_id is None:
+        await session.rollback()
+        return False
+
+    await _refresh_environment_source(session=session, environment_id=environment_id)
+    await session.commit()
+    _invalidate_environment_snapshot(environment_id)
+
+    return True
@@ -1,9 +1,23 @@
-"""
-Global model schemas for the application.
-"""
-
-from pydantic import BaseModel
-
-
-class GenericErrorData(BaseModel):
-    detail: str
+"""
+Global model schemas for the application.
+"""
+
+from uuid import UUID
+
+from pydantic import BaseModel
+
+
+class GenericErrorData(BaseModel):
+    detail: str
+
+
+class CursorPage[T](BaseModel):
+    """
+    Page of items together with the cursor for fetching the next page.
+
+    next_cursor is the ID of the last item of a full page, to be passed back
+    as the "after" query parameter, or None when there are no further pages.
+    """
+
+    items: list[T]
+    next_cursor: UUID | None = None
@@ -1,32 +1,143 @@
-"""
-Main module for the FastAPI application.
-"""
-
-from contextlib import asynccontextmanager
-
-from fastapi import FastAPI
-from sqlalchemy.ext.asyncio.engine import create_async_engine
-from sqlmodel import SQLModel
-
-from app import create_app
-
-
-@asynccontextmanager
-async def _lifespan(_app: FastAPI):
-    """
-    Context manager that creates and disposes the database
-    """
-    engine = create_async_engine(url="sqlite+aiosqlite:///database.db", connect_args={"check_same_thread": False})
-
-    try:
-        async with engine.begin() as conn:
-            await conn.run_sync(SQLModel.metadata.create_all)
-
-        yield {
-            "engine": engine,
-        }
-    finally:
-        await engine.dispose()
-
-
-app = create_app(lifespan=_lifespan)
+"""
+Main module for the FastAPI application.
+"""
+
+import asyncio
+import hashlib
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+from sqlalchemy.ext.asyncio.engine import create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app import create_app
+
+POOL_SIZE = 20
+
+logger = logging.getLogger(__name__)
+
+
+def _schema_fingerprint() -> str:
+    """
+    Stable hash of every table, column, foreign key, and index in the metadata.
+
+    Changes whenever the declared schema changes — including index-only or
+    foreign-key-attribute changes — so it can stand in for "create_all
+    already ran" across restarts.
+    """
+    tables = sorted(SQLModel.metadata.tables.values(), key=lambda table: table.name)
+    parts = []
+
+    for table in tables:
+        columns = ",".join(f"{column.name}:{column.type}" for column in table.columns)
+        foreign_keys = ",".join(
+            sorted(f"{fk.parent.name}->{fk.target_fullname}:{fk.ondelete}" for fk in table.foreign_keys)
+        )
+        indexes = ",".join(
+            sorted(f"{index.name}({','.join(column.name for column in index.columns)})" for index in table.indexes)
+        )
+        parts.append(f"{table.name}({columns})[{foreign_keys}][{indexes}]")
+
+    return hashlib.sha256(";".join(parts).encode()).hexdigest()
+
+
+async def _ensure_schema(engine: AsyncEngine) -> None:
+    """
+    Run create_all only when the stored schema fingerprint is stale.
+
+    create_all probes every table with reflection queries on each start; on a
+    warm database a single marker-row read replaces all of them. A changed
+    fingerprint on an already-initialized database is logged loudly, because
+    create_all only adds missing tables and cannot alter existing ones.
+    """
+    fingerprint = _schema_fingerprint()
+
+    try:
+        async with engine.connect() as connection:
+            result = await connection.execute(text("SELECT version FROM _schema_version"))
+            stored = result.scalar()
+    except DBAPIError:
+        stored = None
+
+    if stored == fingerprint:
+        return
+
+    if stored is not None:
+        logger.warning(
+            "Declared schema no longer matches the stored fingerprint; create_all only adds missing "
+            "tables and cannot alter existing ones, so index or column changes need a manual migration."
+        )
+
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+        await connection.execute(text("CREATE TABLE IF NOT EXISTS _schema_version (version TEXT NOT NULL)"))
+        await connection.execute(text("DELETE FROM _schema_version"))
+        await connection.execute(
+            text("INSERT INTO _schema_version (version) VALUES (:version)"), {"version": fingerprint}
+        )
+
+
+async def _warm_connection_pool(engine: AsyncEngine) -> None:
+    """
+    Open and release every pooled connection before serving traffic.
+
+    Connection establishment otherwise happens lazily on first checkout, so
+    the first POOL_SIZE requests would each pay the connect cost; opening them
+    all here moves that tail latency to startup.
+    """
+
+    async def ping() -> None:
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(ping() for _ in range(POOL_SIZE)))
+
+
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    """
+    Context manager that creates and disposes the database
+    """
+    # Pool sizing rule of thumb: pool_size + max_overflow should cover
+    # (server workers * per-worker request concurrency) to avoid pool timeouts.
+    engine = create_async_engine(
+        url="sqlite+aiosqlite:///database.db",
+        query_cache_size=1200,
+        pool_size=POOL_SIZE,
+        max_overflow=20,
+        pool_timeout=30,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _configure_sqlite(dbapi_connection, _connection_record):
+        # WAL lets readers proceed during writes; synchronous=NORMAL drops the
+        # per-commit fsync to one per WAL checkpoint, which WAL makes safe.
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    try:
+        await _ensure_schema(engine)
+        await _warm_connection_pool(engine)
+
+        yield {
+            "engine": engine,
+            "sessionmaker": session_factory,
+        }
+    finally:
+        await engine.dispose()
+
+
+app = create_app(lifespan=_lifespan)
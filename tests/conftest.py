@@ -1,29 +1,69 @@
-from contextlib import asynccontextmanager
-
-import pytest
-from fastapi import FastAPI
-from fastapi.testclient import TestClient
-from sqlalchemy.ext.asyncio.engine import create_async_engine
-from sqlmodel import SQLModel
-
-from app import create_app
-
-
-@asynccontextmanager
-async def _lifespan(_app: FastAPI):
-    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
-
-    async with engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.create_all)
-
-    yield {"engine": engine}
-
-    await engine.dispose()
-
-
-@pytest.fixture
-def test_client():
-    app = create_app(lifespan=_lifespan)
-
-    with TestClient(app) as client:
-        yield client
+from contextlib import asynccontextmanager
+
+import httpx
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.ext.asyncio.engine import create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app import create_app
+
+
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    # StaticPool pins the single in-memory database to one connection so it
+    # survives for the whole session-scoped client.
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:", poolclass=StaticPool, connect_args={"check_same_thread": False}
+    )
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _enable_foreign_keys(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    yield {"engine": engine, "sessionmaker": session_factory}
+
+    await engine.dispose()
+
+
+def _json(self: httpx.Response, **_kwargs):
+    return orjson.loads(self.content)
+
+
+# Decode response bodies with orjson instead of stdlib json; the app already
+# encodes with orjson server-side.
+httpx.Response.json = _json  # type: ignore[method-assign]
+
+
+@pytest.fixture(scope="session")
+def app() -> FastAPI:
+    """The application under test, built exactly once per worker."""
+    return create_app(lifespan=_lifespan)
+
+
+@pytest.fixture(scope="session")
+def test_client(app: FastAPI):
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def environment(test_client: TestClient) -> dict:
+    """A freshly created environment, for tests that only need one to exist."""
+    response = test_client.post("/environment", json={"title": "Testing", "description": "Shared test environment"})
+    response.raise_for_status()
+
+    return response.json()
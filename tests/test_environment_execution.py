@@ -0,0 +1,84 @@
+from fastapi.testclient import TestClient
+from hamcrest import assert_that, equal_to
+
+from tests.matchers import assert_subset
+
+MUL_VALUES_CODE = """\
+def mul(a: int, b: int) -> int:
+    return a * b"""
+
+SUM_VALUES_CODE = """\
+def sum(a: int, b: int) -> int:
+    return a + b"""
+
+RAISE_CUSTOM_ERROR_CODE = """\
+class CustomError(Exception):
+    pass
+
+def boom():
+    raise CustomError("custom failure")"""
+
+
+def test_valid_execution_with_positional_arguments(test_client: TestClient, environment: dict):
+    response = test_client.post(f"/environment/{environment['id']}/definition", json={"code": MUL_VALUES_CODE})
+    response.raise_for_status()
+
+    response = test_client.post(f"/environment/{environment['id']}/exec", json={"callable": "mul", "args": [3, 4]})
+
+    assert_that(response.status_code, equal_to(200))
+    assert_subset(response.json(), {"result": 12})
+
+
+def test_valid_execution_with_keyword_arguments(test_client: TestClient, environment: dict):
+    response = test_client.post(f"/environment/{environment['id']}/definition", json={"code": SUM_VALUES_CODE})
+    response.raise_for_status()
+
+    response = test_client.post(
+        f"/environment/{environment['id']}/exec", json={"callable": "sum", "kwargs": {"a": 2, "b": 5}}
+    )
+
+    assert_that(response.status_code, equal_to(200))
+    assert_subset(response.json(), {"result": 7})
+
+
+def test_valid_execution_with_multiple_definitions(test_client: TestClient, environment: dict):
+    for code in (MUL_VALUES_CODE, SUM_VALUES_CODE):
+        response = test_client.post(f"/environment/{environment['id']}/definition", json={"code": code})
+        response.raise_for_status()
+
+    response = test_client.post(f"/environment/{environment['id']}/exec", json={"callable": "sum", "args": [1, 2]})
+
+    assert_that(response.status_code, equal_to(200))
+    assert_subset(response.json(), {"result": 3})
+
+
+def test_execution_with_unknown_callable(test_client: TestClient, environment: dict):
+    response = test_client.post(f"/environment/{environment['id']}/exec", json={"callable": "missing"})
+
+    assert_that(response.status_code, equal_to(400))
+    assert_subset(response.json(), {"detail": 'Error occurred while executing "missing"'})
+
+
+def test_execution_with_user_defined_exception(test_client: TestClient, environment: dict):
+    response = test_client.post(f"/environment/{environment['id']}/definition", json={"code": RAISE_CUSTOM_ERROR_CODE})
+    response.raise_for_status()
+
+    response = test_client.post(f"/environment/{environment['id']}/exec", json={"callable": "boom"})
+
+    assert_that(response.status_code, equal_to(400))
+    assert_subset(
+        response.json(),
+        {
+            "detail": 'Error occurred while executing "boom"',
+            "type": "CustomError",
+            "message": "custom failure",
+        },
+    )
+
+
+def test_execution_in_nonexistent_environment(test_client: TestClient):
+    response = test_client.post(
+        "/environment/00000000-0000-0000-0000-000000000000/exec", json={"callable": "mul", "args": [1, 2]}
+    )
+
+    assert_that(response.status_code, equal_to(404))